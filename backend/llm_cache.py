@@ -0,0 +1,195 @@
+"""
+Response cache for TechHelper AI.
+Answers repeated questions without calling the AI provider again.
+"""
+
+import os
+import time
+import json
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import List, Dict, Optional, Protocol
+
+from ai_providers import AIProvider
+
+
+class CacheBackend(Protocol):
+    """Key/value storage used by the response cache."""
+
+    async def get(self, key: str) -> Optional[str]:
+        ...
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        ...
+
+
+class MemoryBackend:
+    """In-process LRU cache with per-entry expiry (good for a single worker)."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        self._data[key] = (time.time() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+
+class RedisBackend:
+    """Redis-backed cache, shared by every worker (pip install redis)."""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+        self._redis = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self._redis.get(key)
+        return value.decode() if value is not None else None
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        await self._redis.set(key, value, ex=ttl)
+
+
+class SemanticIndex:
+    """
+    Matches paraphrased opening questions by embedding similarity.
+    Needs: pip install sentence-transformers
+    """
+
+    # Recently embedded questions: on a miss, LLMCache.get and LLMCache.set
+    # both need the same question's vector, and it is only encoded once
+    RECENT_EMBEDDINGS = 64
+
+    def __init__(self, threshold: float = 0.92, max_entries: int = 1024,
+                 model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+        import numpy as np
+        from sentence_transformers import SentenceTransformer
+
+        self._np = np
+        self.model = SentenceTransformer(model_name)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        # Ring buffer: once full, each new question replaces the oldest one
+        self._vectors = np.zeros((max_entries, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        self._keys: List[Optional[str]] = [None] * max_entries
+        self._count = 0
+        self._next = 0
+        self._recent: OrderedDict[str, object] = OrderedDict()
+
+    async def embed(self, text: str):
+        vector = self._recent.get(text)
+        if vector is None:
+            # Encoding is CPU-bound, keep it off the event loop
+            vector = await asyncio.to_thread(self.model.encode, text, normalize_embeddings=True)
+            vector = vector.astype(self._np.float32)
+            self._recent[text] = vector
+            if len(self._recent) > self.RECENT_EMBEDDINGS:
+                self._recent.popitem(last=False)
+        return vector
+
+    def search(self, vector) -> Optional[str]:
+        """Return the cache key of the closest stored question, if close enough."""
+        if not self._count:
+            return None
+        scores = self._vectors[:self._count] @ vector  # Cosine similarity (vectors are normalized)
+        best = int(scores.argmax())
+        return self._keys[best] if scores[best] >= self.threshold else None
+
+    def add(self, vector, key: str):
+        self._vectors[self._next] = vector
+        self._keys[self._next] = key
+        self._next = (self._next + 1) % self.max_entries
+        self._count = min(self._count + 1, self.max_entries)
+
+
+class LLMCache:
+    """Caches AI responses by provider, model and conversation history."""
+
+    def __init__(self, backend: CacheBackend, ttl: int = 3600,
+                 semantic: Optional[SemanticIndex] = None):
+        self.backend = backend
+        self.ttl = ttl
+        self.semantic = semantic
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(provider: AIProvider, messages: List[Dict[str, str]]) -> str:
+        payload = json.dumps({
+            "provider": type(provider).__name__,
+            "model": getattr(provider, "model", ""),
+            "messages": messages
+        }, sort_keys=True)
+        return "llm:" + hashlib.sha256(payload.encode()).hexdigest()
+
+    @staticmethod
+    def _opening_question(messages: List[Dict[str, str]]) -> Optional[str]:
+        # Only first questions are matched semantically - later turns depend on
+        # the conversation so far, and a paraphrase match there would be wrong
+        if len(messages) == 2 and messages[0]["role"] == "system" and messages[1]["role"] == "user":
+            return messages[1]["content"]
+        return None
+
+    async def get(self, provider: AIProvider, messages: List[Dict[str, str]]) -> Optional[str]:
+        key = self.make_key(provider, messages)
+        response = await self.backend.get(key)
+
+        if response is None and self.semantic:
+            question = self._opening_question(messages)
+            if question:
+                similar_key = self.semantic.search(await self.semantic.embed(question))
+                if similar_key:
+                    response = await self.backend.get(similar_key)
+
+        if response is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return response
+
+    async def set(self, provider: AIProvider, messages: List[Dict[str, str]], response: str):
+        key = self.make_key(provider, messages)
+        await self.backend.set(key, response, ttl=self.ttl)
+
+        if self.semantic:
+            question = self._opening_question(messages)
+            if question:
+                self.semantic.add(await self.semantic.embed(question), key)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+def get_cache() -> Optional[LLMCache]:
+    """Build the response cache from environment settings.
+    May load (and download) the embedding model, so call it off the event loop."""
+    if os.getenv("RESPONSE_CACHE", "true").lower() != "true":
+        return None
+
+    redis_url = os.getenv("REDIS_URL")
+    backend = RedisBackend(redis_url) if redis_url else MemoryBackend()
+
+    semantic = None
+    if os.getenv("SEMANTIC_CACHE", "false").lower() == "true":
+        semantic = SemanticIndex(threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")))
+
+    return LLMCache(backend, ttl=int(os.getenv("RESPONSE_CACHE_TTL", "3600")), semantic=semantic)
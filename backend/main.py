@@ -4,19 +4,29 @@ FastAPI server with usage tracking for cost management.
 """
 
 import os
-import json
 import uuid
+import asyncio
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import List, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, field, asdict
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+import orjson
+from sortedcontainers import SortedKeyList
+from fastapi import FastAPI, HTTPException, Query, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
-from ai_providers import get_provider, Message, AIProvider
+from ai_providers import get_provider, close_http_client, Message, Usage, AIProvider
+from llm_cache import get_cache, LLMCache
+from tokenization import count_tokens, load_encoder
+
+
+# Conversation turns (user + assistant pairs) sent to the AI with each message
+MAX_TURNS = int(os.getenv("MAX_TURNS", "12"))
+if MAX_TURNS < 0:
+    raise ValueError("MAX_TURNS must be 0 or more")
 
 
 # ============== Data Models ==============
@@ -38,12 +48,13 @@ class SessionStats(BaseModel):
     message_count: int
     total_input_tokens: int
     total_output_tokens: int
+    total_cached_tokens: int
     estimated_cost: float
     created_at: str
     last_activity: str
 
 
-@dataclass
+@dataclass(eq=False)  # Compared by identity, so the store can index sessions
 class Session:
     """Tracks a support session with usage metrics."""
     id: str
@@ -51,38 +62,67 @@ class Session:
     message_count: int = 0
     total_input_tokens: int = 0
     total_output_tokens: int = 0
+    total_cached_tokens: int = 0
     estimated_cost: float = 0.0
-    created_at: str = ""
-    last_activity: str = ""
+    # Epoch seconds; formatted only when shown in API responses
+    created_at_ts: float = field(default_factory=time.time)
+    last_activity_ts: float = 0.0
+    # Provider-ready copy of `messages`, grown one entry per turn
+    messages_serialized: List[dict] = field(default_factory=list)
+    # How many of `messages` a persistent store has already written
+    saved_messages: int = 0
     
     def __post_init__(self):
-        if not self.created_at:
-            self.created_at = datetime.now().isoformat()
-        self.last_activity = datetime.now().isoformat()
+        if not self.messages_serialized:
+            self.messages_serialized = [asdict(m) for m in self.messages]
+        if not self.last_activity_ts:
+            self.last_activity_ts = self.created_at_ts
+    
+    @property
+    def created_at(self) -> str:
+        return datetime.fromtimestamp(self.created_at_ts).isoformat()
+    
+    @property
+    def last_activity(self) -> str:
+        return datetime.fromtimestamp(self.last_activity_ts).isoformat()
+    
+    def add_message(self, role: str, content: str):
+        self.messages.append(Message(role=role, content=content))
+        self.messages_serialized.append({"role": role, "content": content})
     
-    def add_usage(self, input_tokens: int, output_tokens: int, cost: float):
+    def trim_history(self, max_turns: int = MAX_TURNS):
+        """Keep the system prompt and recent turns for the AI.
+        The full transcript stays in `messages` for human helpers."""
+        if max_turns < 0:
+            raise ValueError("max_turns must be 0 or more")
+        # Trim in blocks: once over max_turns, cut back to about half. The
+        # prompt prefix then stays the same for several turns in a row, so
+        # providers can reuse their prompt cache for it
+        history = self.messages_serialized
+        if len(history) - 1 > max_turns * 2:
+            keep = (max_turns + 1) // 2 * 2
+            del history[1:len(history) - keep]
+    
+    def add_usage(self, input_tokens: int, output_tokens: int, cost: float, cached_tokens: int = 0):
         self.message_count += 1
         self.total_input_tokens += input_tokens
         self.total_output_tokens += output_tokens
+        self.total_cached_tokens += cached_tokens
         self.estimated_cost += cost
-        self.last_activity = datetime.now().isoformat()
+        self.last_activity_ts = time.time()
+
+
+def history_turns(turns: int, max_turns: int = MAX_TURNS) -> int:
+    """How many of the last `turns` turns Session.trim_history leaves for the AI."""
+    if turns <= max_turns:
+        return turns
+    low = (max_turns + 1) // 2
+    return low + (turns - max_turns - 1) % (max_turns - low + 1)
 
 
 # ============== Storage ==============
 
-class SessionStore:
-    """Simple in-memory session store (use Redis/DB in production)."""
-    
-    def __init__(self):
-        self.sessions: dict[str, Session] = {}
-    
-    def create(self) -> Session:
-        session_id = str(uuid.uuid4())[:8]
-        session = Session(
-            id=session_id,
-            messages=[Message(
-                role="system",
-                content="""You are TechHelper, a patient and friendly tech support assistant for seniors.
+SYSTEM_PROMPT = """You are TechHelper, a patient and friendly tech support assistant for seniors.
 
 SPEAKING STYLE:
 - Use simple, clear language. Avoid jargon.
@@ -103,41 +143,233 @@ ESCALATION:
 - Never ask seniors to do risky things (delete system files, etc.)
 
 Remember: The person you're helping may be anxious about technology. Be extra patient and reassuring."""
-            )]
-        )
-        self.sessions[session_id] = session
+
+
+def new_session() -> Session:
+    return Session(
+        id=str(uuid.uuid4())[:8],
+        messages=[Message(role="system", content=SYSTEM_PROMPT)]
+    )
+
+
+class SessionStore:
+    """Simple in-memory session store (set REDIS_URL to share sessions between workers)."""
+    
+    def __init__(self):
+        self.sessions: dict[str, Session] = {}
+        # Running totals and a most-recent-first index, kept up to date by
+        # add_usage so stats and cleanup never scan every session
+        self.total_cost = 0.0
+        self.total_messages = 0
+        self.by_activity = SortedKeyList(key=lambda s: -s.last_activity_ts)
+    
+    async def create(self) -> Session:
+        session = new_session()
+        self.sessions[session.id] = session
+        self.by_activity.add(session)
         return session
     
-    def get(self, session_id: str) -> Optional[Session]:
+    async def get(self, session_id: str) -> Optional[Session]:
         return self.sessions.get(session_id)
     
+    async def transcript(self, session_id: str) -> Optional[List[Message]]:
+        """The whole conversation, including turns no longer sent to the AI."""
+        session = self.sessions.get(session_id)
+        return session.messages if session else None
+    
+    async def add_usage(self, session: Session, input_tokens: int, output_tokens: int,
+                        cost: float, cached_tokens: int = 0):
+        """Record usage on a session and update the store-wide stats."""
+        self.by_activity.remove(session)  # Re-sorted below with its new activity time
+        session.add_usage(input_tokens, output_tokens, cost, cached_tokens)
+        self.by_activity.add(session)
+        self.total_cost += cost
+        self.total_messages += 1
+    
+    async def stats(self, limit: Optional[int] = None) -> dict:
+        """Store-wide totals plus sessions, most recent first."""
+        return {
+            "active_sessions": len(self.sessions),
+            "total_messages": self.total_messages,
+            "total_cost": self.total_cost,
+            "sessions": [
+                {
+                    "id": s.id,
+                    "message_count": s.message_count,
+                    "estimated_cost": s.estimated_cost,
+                    "last_activity_ts": s.last_activity_ts
+                }
+                for s in self.by_activity.islice(0, limit)
+            ]
+        }
+    
     def cleanup_old(self, max_age_hours: int = 24):
         """Remove sessions older than max_age_hours."""
-        cutoff = datetime.now() - timedelta(hours=max_age_hours)
-        to_remove = []
-        for sid, session in self.sessions.items():
-            last = datetime.fromisoformat(session.last_activity)
-            if last < cutoff:
-                to_remove.append(sid)
-        for sid in to_remove:
-            del self.sessions[sid]
+        cutoff = time.time() - max_age_hours * 3600
+        while self.by_activity and self.by_activity[-1].last_activity_ts < cutoff:
+            session = self.by_activity.pop()
+            del self.sessions[session.id]
+            self.total_cost -= session.estimated_cost
+            self.total_messages -= session.message_count
+
+
+class RedisSessionStore:
+    """
+    Redis-backed session store, shared by every worker (pip install redis).
+    Each session is a small hash of its stats plus a list of its messages,
+    so a turn only loads the recent messages and appends the new ones. Sessions expire after
+    SESSION_TTL of inactivity, so no cleanup is needed.
+    """
+    
+    SESSION_TTL = 24 * 3600
+    STAT_FIELDS = ("message_count", "total_input_tokens", "total_output_tokens",
+                   "total_cached_tokens", "estimated_cost", "created_at_ts", "last_activity_ts")
+    FLOAT_FIELDS = {"estimated_cost", "created_at_ts", "last_activity_ts"}
+    
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+        self._redis = redis.from_url(url)
+    
+    @staticmethod
+    def _key(session_id: str) -> str:
+        return f"session:{session_id}"
+    
+    def _save_messages(self, pipe, session: Session):
+        key = self._key(session.id)
+        new_messages = session.messages[session.saved_messages:]
+        if new_messages:
+            pipe.rpush(f"{key}:messages", *(orjson.dumps(asdict(m)) for m in new_messages))
+        pipe.expire(key, self.SESSION_TTL)
+        pipe.expire(f"{key}:messages", self.SESSION_TTL)
+        pipe.zadd("sessions:by_activity", {session.id: session.last_activity_ts})
+        session.saved_messages = len(session.messages)
+    
+    async def create(self) -> Session:
+        session = new_session()
+        async with self._redis.pipeline() as pipe:
+            pipe.hset(self._key(session.id),
+                      mapping={name: getattr(session, name) for name in self.STAT_FIELDS})
+            self._save_messages(pipe, session)
+            await pipe.execute()
+        return session
+    
+    async def get(self, session_id: str) -> Optional[Session]:
+        """Load a session with just the messages the AI still sees (use
+        transcript() for the whole conversation)."""
+        key = self._key(session_id)
+        async with self._redis.pipeline() as pipe:
+            pipe.hgetall(key)
+            pipe.llen(f"{key}:messages")
+            pipe.lindex(f"{key}:messages", 0)
+            pipe.lrange(f"{key}:messages", -(MAX_TURNS * 2 + 1), -1)
+            stats, length, system_message, tail = await pipe.execute()
+        if not stats or not length:
+            return None
+        
+        # Same view trim_history would have left after every turn so far
+        # (an unanswered message from a failed turn stays in the view)
+        history = length - 1
+        turns = history // 2
+        keep = min(history - 2 * (turns - history_turns(turns)), len(tail))
+        messages_serialized = [orjson.loads(system_message)]
+        messages_serialized.extend(orjson.loads(raw) for raw in tail[len(tail) - keep:])
+        
+        # `messages` holds only this window, so only messages added from now on are saved
+        messages = [Message(**m) for m in messages_serialized]
+        return Session(
+            id=session_id,
+            messages=messages,
+            messages_serialized=messages_serialized,
+            saved_messages=len(messages),
+            **{name: (float if name in self.FLOAT_FIELDS else int)(value)
+               for name, value in ((k.decode(), v) for k, v in stats.items())}
+        )
+    
+    async def transcript(self, session_id: str) -> Optional[List[Message]]:
+        """The whole conversation, including turns no longer sent to the AI."""
+        raw_messages = await self._redis.lrange(f"{self._key(session_id)}:messages", 0, -1)
+        return [Message(**orjson.loads(raw)) for raw in raw_messages] if raw_messages else None
+    
+    async def add_usage(self, session: Session, input_tokens: int, output_tokens: int,
+                        cost: float, cached_tokens: int = 0):
+        """Record usage on a session and save it (including its latest messages)."""
+        session.add_usage(input_tokens, output_tokens, cost, cached_tokens)
+        key = self._key(session.id)
+        async with self._redis.pipeline() as pipe:
+            # Increment rather than write our copy's totals: another worker may
+            # have recorded a turn on this session since it was loaded
+            pipe.hincrby(key, "message_count", 1)
+            pipe.hincrby(key, "total_input_tokens", input_tokens)
+            pipe.hincrby(key, "total_output_tokens", output_tokens)
+            pipe.hincrby(key, "total_cached_tokens", cached_tokens)
+            pipe.hincrbyfloat(key, "estimated_cost", cost)
+            pipe.hset(key, "last_activity_ts", session.last_activity_ts)
+            self._save_messages(pipe, session)
+            pipe.hincrbyfloat("sessions:stats", "total_cost", cost)
+            pipe.hincrby("sessions:stats", "total_messages", 1)
+            results = await pipe.execute()
+        
+        # Pick up the totals including any other worker's turns
+        (session.message_count, session.total_input_tokens, session.total_output_tokens,
+         session.total_cached_tokens, session.estimated_cost) = results[:5]
+    
+    async def stats(self, limit: Optional[int] = None) -> dict:
+        """Totals since the store was created, plus live sessions, most recent first."""
+        cutoff = time.time() - self.SESSION_TTL
+        async with self._redis.pipeline() as pipe:
+            pipe.zremrangebyscore("sessions:by_activity", "-inf", cutoff)
+            pipe.zrevrange("sessions:by_activity", 0, -1 if limit is None else limit - 1)
+            pipe.zcard("sessions:by_activity")
+            pipe.hgetall("sessions:stats")
+            _, ids, active, totals = await pipe.execute()
+        
+        # Only the few stats fields are read, never the transcripts
+        rows = []
+        if ids:
+            async with self._redis.pipeline() as pipe:
+                for sid in ids:
+                    pipe.hmget(self._key(sid.decode()), "message_count", "estimated_cost", "last_activity_ts")
+                rows = await pipe.execute()
+        
+        return {
+            "active_sessions": active,
+            "total_messages": int(totals.get(b"total_messages", 0)),
+            "total_cost": float(totals.get(b"total_cost", 0.0)),
+            "sessions": [
+                {
+                    "id": sid.decode(),
+                    "message_count": int(count),
+                    "estimated_cost": float(cost),
+                    "last_activity_ts": float(last_activity)
+                }
+                for sid, (count, cost, last_activity) in zip(ids, rows)
+                if count is not None
+            ]
+        }
+
+
+def get_session_store():
+    """Use Redis when REDIS_URL is set, otherwise keep sessions in memory."""
+    redis_url = os.getenv("REDIS_URL")
+    return RedisSessionStore(redis_url) if redis_url else SessionStore()
 
 
 # ============== Application ==============
 
-store = SessionStore()
+store = get_session_store()
 ai_provider: Optional[AIProvider] = None
+response_cache: Optional[LLMCache] = None
 
 
 def estimate_tokens(text: str) -> int:
-    """Rough token estimation (4 chars ≈ 1 token)."""
-    return len(text) // 4
+    """Count tokens for the active model (estimates in mock mode)."""
+    return count_tokens(text, ai_provider.model if ai_provider else None)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize AI provider on startup."""
-    global ai_provider
+    global ai_provider, response_cache
     
     provider_name = os.getenv("AI_PROVIDER", "ollama")
     mock_mode = os.getenv("MOCK_MODE", "false").lower() == "true"
@@ -151,18 +383,25 @@ async def lifespan(app: FastAPI):
         
         try:
             ai_provider = get_provider(provider_name)
-            # Test the connection
-            test_response = await ai_provider.chat([Message(role="user", content="Hi")])
+            # Test the connection (Ollama also loads the model here)
+            await ai_provider.warm_up()
             print(f"✅ AI provider ready: {provider_name}")
+            # tiktoken may download its tokenizer here, so keep it off the event loop
+            if not await asyncio.to_thread(load_encoder, ai_provider.model):
+                print(f"   No tokenizer for {ai_provider.model}, estimating tokens from text length")
         except Exception as e:
             print(f"⚠️ Failed to initialize {provider_name}: {e}")
             print("🧪 Falling back to MOCK MODE for testing")
             print(f"   To use real AI: Set up {provider_name} or get an API key")
             ai_provider = None
     
+    if ai_provider is not None:
+        response_cache = await asyncio.to_thread(get_cache)
+    
     yield
     
     print("👋 Shutting down...")
+    await close_http_client()
 
 
 app = FastAPI(
@@ -172,9 +411,17 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Browsers reject "*" together with credentials, so list the frontend origins.
+# Default matches the local frontend server from the README.
+ALLOWED_ORIGINS = frozenset(
+    origin.strip()
+    for origin in os.getenv("ALLOWED_ORIGINS", "http://localhost:8080,http://127.0.0.1:8080").split(",")
+    if origin.strip()
+)
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Restrict in production
+    allow_origins=list(ALLOWED_ORIGINS),
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -199,14 +446,16 @@ async def chat(request: ChatRequest):
     
     # Get or create session
     if request.session_id:
-        session = store.get(request.session_id)
+        session = await store.get(request.session_id)
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
     else:
-        session = store.create()
+        session = await store.create()
     
     # Add user message
-    session.messages.append(Message(role="user", content=request.message))
+    session.add_message("user", request.message)
+    cached = None
+    used_output = cached_tokens = 0
     
     # Estimate input tokens
     input_tokens = estimate_tokens(request.message)
@@ -230,20 +479,31 @@ async def chat(request: ChatRequest):
         else:
             response_text = "I understand you need help with that. Let me see what I can do. Could you tell me a bit more about the problem? What were you trying to do when you got stuck?"
     else:
-        try:
-            response_text = await ai_provider.chat(session.messages)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"AI error: {str(e)}")
-    
-    # Estimate output tokens and cost
-    output_tokens = estimate_tokens(response_text)
-    cost = ai_provider.estimate_cost(input_tokens, output_tokens) if ai_provider else 0.0
+        cached = await response_cache.get(ai_provider, session.messages_serialized) if response_cache else None
+        if cached is not None:
+            response_text = cached
+        else:
+            try:
+                response_text, used_input, used_output, cached_tokens = await ai_provider.chat_with_usage(
+                    session.messages_serialized
+                )
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"AI error: {str(e)}")
+            if response_cache:
+                await response_cache.set(ai_provider, session.messages_serialized, response_text)
+            # Prefer the provider's own token counts when it reports them
+            input_tokens = used_input or input_tokens
     
-    # Track usage
-    session.add_usage(input_tokens, output_tokens, cost)
+    # Estimate output tokens and cost (cached answers are free)
+    output_tokens = used_output or estimate_tokens(response_text)
+    cost = ai_provider.estimate_cost(input_tokens, output_tokens, cached_tokens) if ai_provider and cached is None else 0.0
     
     # Add assistant response to history
-    session.messages.append(Message(role="assistant", content=response_text))
+    session.add_message("assistant", response_text)
+    session.trim_history()
+    
+    # Track usage (also saves the session)
+    await store.add_usage(session, input_tokens, output_tokens, cost, cached_tokens)
     
     return ChatResponse(
         response=response_text,
@@ -252,68 +512,139 @@ async def chat(request: ChatRequest):
     )
 
 
+# Streamed chunks are sent once this many have queued up or this much time has passed
+STREAM_BATCH_CHUNKS = 8
+STREAM_BATCH_SECONDS = 0.03
+
+
+async def send_json(websocket: WebSocket, data: dict):
+    """Send a JSON text frame encoded with orjson."""
+    # Text (not binary) frames, so the browser still gets a string to JSON.parse
+    await websocket.send_text(orjson.dumps(data).decode())
+
+
+async def stream_batched(websocket: WebSocket, stream) -> str:
+    """Forward a response stream in batches; returns the full response text."""
+    full_response = ""
+    pending = []
+    last_flush = time.monotonic()
+    # The next chunk is awaited as a task, so queued chunks can still be sent
+    # on time while the provider is slow to produce more
+    next_chunk = asyncio.ensure_future(stream.__anext__())
+    try:
+        while True:
+            timeout = max(0.0, last_flush + STREAM_BATCH_SECONDS - time.monotonic()) if pending else None
+            done, _ = await asyncio.wait({next_chunk}, timeout=timeout)
+            if done:
+                try:
+                    chunk = next_chunk.result()
+                except StopAsyncIteration:
+                    break
+                next_chunk = asyncio.ensure_future(stream.__anext__())
+                full_response += chunk
+                pending.append(chunk)
+                if len(pending) < STREAM_BATCH_CHUNKS and time.monotonic() - last_flush < STREAM_BATCH_SECONDS:
+                    continue
+            
+            await send_json(websocket, {
+                "chunk": "".join(pending),
+                "done": False
+            })
+            pending.clear()
+            last_flush = time.monotonic()
+    finally:
+        # Stop the provider request too if the client went away mid-stream
+        if not next_chunk.done():
+            next_chunk.cancel()
+            await asyncio.wait({next_chunk})
+        await stream.aclose()
+    
+    if pending:
+        await send_json(websocket, {
+            "chunk": "".join(pending),
+            "done": False
+        })
+    return full_response
+
+
 @app.websocket("/ws/{session_id}")
 async def websocket_chat(websocket: WebSocket, session_id: str):
     """WebSocket for real-time streaming chat with voice support."""
     await websocket.accept()
     
-    session = store.get(session_id)
+    session = await store.get(session_id)
     if not session:
-        await websocket.send_json({"error": "Session not found"})
+        await send_json(websocket, {"error": "Session not found"})
         await websocket.close()
         return
     
     try:
         while True:
             # Receive message from client
-            data = await websocket.receive_json()
+            data = orjson.loads(await websocket.receive_text())
             user_message = data.get("message", "")
             
             if not user_message:
                 continue
             
             # Add to session
-            session.messages.append(Message(role="user", content=user_message))
+            session.add_message("user", user_message)
             input_tokens = estimate_tokens(user_message)
             
             # Stream AI response
             full_response = ""
+            cached = None
+            usage = Usage()
             
             if ai_provider is None:
-                await websocket.send_json({
+                await send_json(websocket, {
                     "chunk": "(AI not configured - testing mode)",
                     "done": True
                 })
                 full_response = "(AI not configured - testing mode)"
             else:
-                try:
-                    async for chunk in ai_provider.chat_stream(session.messages):
-                        full_response += chunk
-                        await websocket.send_json({
-                            "chunk": chunk,
-                            "done": False
-                        })
-                    
-                    # Send completion signal
-                    await websocket.send_json({"done": True})
-                    
-                except Exception as e:
-                    await websocket.send_json({
-                        "error": str(e),
+                if response_cache:
+                    cached = await response_cache.get(ai_provider, session.messages_serialized)
+                
+                if cached is not None:
+                    full_response = cached
+                    await send_json(websocket, {
+                        "chunk": cached,
                         "done": True
                     })
-                    continue
-            
-            # Track usage
-            output_tokens = estimate_tokens(full_response)
-            cost = ai_provider.estimate_cost(input_tokens, output_tokens) if ai_provider else 0.0
-            session.add_usage(input_tokens, output_tokens, cost)
+                else:
+                    try:
+                        # Group small chunks into fewer frames without delaying the stream noticeably
+                        full_response = await stream_batched(
+                            websocket, ai_provider.chat_stream(session.messages_serialized, usage)
+                        )
+                        
+                        # Send completion signal
+                        await send_json(websocket, {"done": True})
+                        
+                    except Exception as e:
+                        await send_json(websocket, {
+                            "error": str(e),
+                            "done": True
+                        })
+                        continue
+                    
+                    if response_cache:
+                        await response_cache.set(ai_provider, session.messages_serialized, full_response)
             
             # Add to history
-            session.messages.append(Message(role="assistant", content=full_response))
+            session.add_message("assistant", full_response)
+            session.trim_history()
+            
+            # Track usage the same way as /chat: the provider's counts when it
+            # reports them (cached answers are free; also saves the session)
+            input_tokens = usage.input_tokens or input_tokens
+            output_tokens = usage.output_tokens or estimate_tokens(full_response)
+            cost = ai_provider.estimate_cost(input_tokens, output_tokens, usage.cached_tokens) if ai_provider and cached is None else 0.0
+            await store.add_usage(session, input_tokens, output_tokens, cost, usage.cached_tokens)
             
             # Send cost update
-            await websocket.send_json({
+            await send_json(websocket, {
                 "type": "stats",
                 "session_cost": round(session.estimated_cost, 6),
                 "this_message_cost": round(cost, 6),
@@ -327,7 +658,7 @@ async def websocket_chat(websocket: WebSocket, session_id: str):
 @app.get("/session/{session_id}/stats", response_model=SessionStats)
 async def get_session_stats(session_id: str):
     """Get usage stats for a session."""
-    session = store.get(session_id)
+    session = await store.get(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
@@ -336,6 +667,7 @@ async def get_session_stats(session_id: str):
         message_count=session.message_count,
         total_input_tokens=session.total_input_tokens,
         total_output_tokens=session.total_output_tokens,
+        total_cached_tokens=session.total_cached_tokens,
         estimated_cost=round(session.estimated_cost, 6),
         created_at=session.created_at,
         last_activity=session.last_activity
@@ -343,24 +675,24 @@ async def get_session_stats(session_id: str):
 
 
 @app.get("/admin/stats")
-async def get_all_stats():
-    """Get stats for all sessions (for admin dashboard)."""
-    total_cost = sum(s.estimated_cost for s in store.sessions.values())
-    total_messages = sum(s.message_count for s in store.sessions.values())
+async def get_all_stats(limit: Optional[int] = Query(None, ge=1)):
+    """Get stats for all sessions, most recent first (for admin dashboard)."""
+    stats = await store.stats(limit)
     
     return {
-        "active_sessions": len(store.sessions),
-        "total_messages": total_messages,
-        "total_estimated_cost_usd": round(total_cost, 4),
+        "active_sessions": stats["active_sessions"],
+        "total_messages": stats["total_messages"],
+        "total_estimated_cost_usd": round(stats["total_cost"], 4),
         "provider": os.getenv("AI_PROVIDER", "ollama"),
+        "response_cache": response_cache.stats() if response_cache else None,
         "sessions": [
             {
-                "id": s.id,
-                "messages": s.message_count,
-                "cost_usd": round(s.estimated_cost, 6),
-                "last_activity": s.last_activity
+                "id": s["id"],
+                "messages": s["message_count"],
+                "cost_usd": round(s["estimated_cost"], 6),
+                "last_activity": datetime.fromtimestamp(s["last_activity_ts"]).isoformat()
             }
-            for s in sorted(store.sessions.values(), key=lambda x: x.last_activity, reverse=True)
+            for s in stats["sessions"]
         ]
     }
 
@@ -368,8 +700,8 @@ async def get_all_stats():
 @app.post("/session/{session_id}/human-help")
 async def request_human_help(session_id: str, phone: Optional[str] = None):
     """Request escalation to human helper."""
-    session = store.get(session_id)
-    if not session:
+    transcript = await store.transcript(session_id)
+    if not transcript:
         raise HTTPException(status_code=404, detail="Session not found")
     
     # In production: send SMS, email, or push notification to available helpers
@@ -377,7 +709,7 @@ async def request_human_help(session_id: str, phone: Optional[str] = None):
     print(f"🚨 HUMAN HELP REQUESTED - Session: {session_id}")
     if phone:
         print(f"   Phone: {phone}")
-    print(f"   Transcript preview: {session.messages[-3:] if len(session.messages) > 3 else session.messages}")
+    print(f"   Transcript preview: {transcript[-3:]}")
     
     return {
         "status": "requested",
@@ -388,4 +720,9 @@ async def request_human_help(session_id: str, phone: Optional[str] = None):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.getenv("WORKERS", "1"))
+    )
@@ -0,0 +1,4 @@
+"""
+AI provider implementations, one module per provider.
+Imported on demand by ai_providers.get_provider.
+"""
@@ -0,0 +1,125 @@
+"""
+Shared pieces for TechHelper AI providers: the provider interface,
+the pooled HTTP client and response parsing helpers.
+"""
+
+import asyncio
+import httpx
+import orjson
+from abc import ABC, abstractmethod
+from typing import AsyncGenerator, List, Dict, Tuple, Optional, Any
+from dataclasses import dataclass
+
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# One pooled HTTP/2 client shared by every provider, so concurrent sessions
+# multiplex over a few kept-alive connections instead of each opening its own
+HTTP_CLIENT = httpx.AsyncClient(
+    http2=True,
+    timeout=httpx.Timeout(60.0, connect=5.0),
+    limits=httpx.Limits(max_connections=200, max_keepalive_connections=50, keepalive_expiry=30.0)
+)
+
+
+async def close_http_client():
+    """Close the shared HTTP client (call on shutdown)."""
+    await HTTP_CLIENT.aclose()
+
+
+async def iter_lines(response: httpx.Response) -> AsyncGenerator[bytes, None]:
+    """Split a streamed body into lines, staying in bytes (no str decode)."""
+    buffer = bytearray()
+    async for chunk in response.aiter_bytes():
+        buffer += chunk
+        start = 0
+        # Copy each line out exactly once; the view must be released before
+        # the buffer is resized
+        view = memoryview(buffer)
+        try:
+            while (end := buffer.find(b"\n", start)) != -1:
+                line_end = end - 1 if end > start and buffer[end - 1] == 0x0D else end  # Drop \r
+                yield bytes(view[start:line_end])
+                start = end + 1
+        finally:
+            view.release()
+        del buffer[:start]
+    if buffer:
+        if buffer.endswith(b"\r"):
+            del buffer[-1:]
+        yield bytes(buffer)
+
+
+async def sse_data_iter(response: httpx.Response) -> AsyncGenerator[memoryview, None]:
+    """Yield the payload of each server-sent `data:` event until [DONE]."""
+    async for line in iter_lines(response):
+        if line.startswith(b"data: "):
+            payload = memoryview(line)[6:]  # Skip the prefix without copying
+            if payload == b"[DONE]":
+                return
+            yield payload
+
+
+# Bodies larger than this are parsed in a worker thread so a long completion
+# doesn't stall other sessions on the event loop
+LARGE_BODY_BYTES = 16384
+
+
+async def parse_json(raw: bytes) -> Any:
+    """Parse a response body, off the event loop when it is large."""
+    if len(raw) > LARGE_BODY_BYTES:
+        return await asyncio.to_thread(orjson.loads, raw)
+    return orjson.loads(raw)
+
+
+def openai_usage(body: Dict[str, Any]) -> Tuple[int, int, int]:
+    """Read (input, output, cached input) token counts from an OpenAI-style response."""
+    usage = body.get("usage") or {}
+    cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+    return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0), cached
+
+
+@dataclass
+class Message:
+    role: str  # "system", "user", "assistant"
+    content: str
+
+
+@dataclass
+class Usage:
+    """Token counts reported by the provider for one response (0 = not reported)."""
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+
+
+class AIProvider(ABC):
+    """Base class for AI providers."""
+    
+    # Providers take messages already serialized as {"role", "content"} dicts
+    # (see Session.messages_serialized) so history isn't rebuilt every turn
+    
+    async def chat(self, messages: List[Dict[str, str]]) -> str:
+        """Get a complete response."""
+        text, _, _, _ = await self.chat_with_usage(messages)
+        return text
+    
+    async def warm_up(self):
+        """Check the provider works before serving users (raises on failure)."""
+        await self.chat([{"role": "user", "content": "Hi"}])
+    
+    @abstractmethod
+    async def chat_with_usage(self, messages: List[Dict[str, str]]) -> Tuple[str, int, int, int]:
+        """Get a complete response with (text, input, output, cached input) token counts."""
+        pass
+    
+    @abstractmethod
+    async def chat_stream(self, messages: List[Dict[str, str]],
+                          usage: Optional[Usage] = None) -> AsyncGenerator[str, None]:
+        """Stream response chunks. If given, `usage` is filled in once the stream ends."""
+        pass
+    
+    @abstractmethod
+    def estimate_cost(self, input_tokens: int, output_tokens: int, cached_tokens: int = 0) -> float:
+        """Estimate cost in USD (cached_tokens is the part of input served from the prompt cache)."""
+        pass
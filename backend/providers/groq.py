@@ -0,0 +1,20 @@
+"""
+Groq provider.
+"""
+
+import os
+
+from providers.openai_compat import OpenAICompatProvider
+
+
+class GroqProvider(OpenAICompatProvider):
+    """
+    Groq - Very fast inference, generous free tier.
+    Free tier: 1,500,000 tokens/day (about 3000 messages)
+    """
+    
+    def __init__(self, api_key: str = None, model: str = "llama-3.3-70b-versatile"):
+        # Free tier available, paid is cheap
+        # Roughly $0.00059 per 1K input, $0.00079 per 1K output
+        super().__init__("https://api.groq.com/openai/v1", model, api_key or os.getenv("GROQ_API_KEY"),
+                         pricing={"input": 0.00059, "output": 0.00079})
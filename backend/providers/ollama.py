@@ -0,0 +1,99 @@
+"""
+Ollama provider (free, runs models locally).
+"""
+
+import logging
+from typing import AsyncGenerator, List, Dict, Tuple, Optional
+
+import httpx
+import orjson
+
+from providers.base import AIProvider, Usage, JSON_HEADERS, HTTP_CLIENT, iter_lines, parse_json
+
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaProvider(AIProvider):
+    """
+    FREE option - Run models locally with Ollama.
+    Install: https://ollama.com
+    Recommended model: llama3.2 (good for conversations, free)
+    """
+    
+    def __init__(self, model: str = "llama3.2", base_url: str = "http://localhost:11434",
+                 keep_alive: str = "30m"):
+        self.model = model
+        self.base_url = base_url
+        # How long Ollama keeps the model loaded after a request, so turns
+        # don't pay the load time again
+        self.keep_alive = keep_alive
+        self.client = HTTP_CLIENT
+        # Local models can take a while to load and answer
+        self.timeout = httpx.Timeout(120.0, connect=5.0)
+        self._url = f"{self.base_url}/api/chat"
+    
+    async def chat_with_usage(self, messages: List[Dict[str, str]]) -> Tuple[str, int, int, int]:
+        response = await self.client.post(
+            self._url,
+            headers=JSON_HEADERS,
+            timeout=self.timeout,
+            content=orjson.dumps({
+                "model": self.model,
+                "messages": messages,
+                "stream": False,
+                "keep_alive": self.keep_alive
+            })
+        )
+        response.raise_for_status()
+        body = await parse_json(response.content)
+        return body["message"]["content"], body.get("prompt_eval_count", 0), body.get("eval_count", 0), 0
+    
+    async def warm_up(self):
+        """Load the model into memory now so the first user doesn't wait for it."""
+        # An empty prompt only loads the model, it doesn't generate anything
+        response = await self.client.post(
+            f"{self.base_url}/api/generate",
+            headers=JSON_HEADERS,
+            timeout=self.timeout,
+            content=orjson.dumps({
+                "model": self.model,
+                "prompt": "",
+                "stream": False,
+                "keep_alive": self.keep_alive
+            })
+        )
+        response.raise_for_status()
+    
+    async def chat_stream(self, messages: List[Dict[str, str]],
+                          usage: Optional[Usage] = None) -> AsyncGenerator[str, None]:
+        async with self.client.stream(
+            "POST",
+            self._url,
+            headers=JSON_HEADERS,
+            timeout=self.timeout,
+            content=orjson.dumps({
+                "model": self.model,
+                "messages": messages,
+                "stream": True,
+                "keep_alive": self.keep_alive
+            })
+        ) as response:
+            response.raise_for_status()
+            # Ollama streams newline-delimited JSON rather than SSE
+            async for line in iter_lines(response):
+                if line.strip():
+                    try:
+                        data = orjson.loads(line)
+                        if "message" in data and "content" in data["message"]:
+                            yield data["message"]["content"]
+                        if data.get("done") and usage is not None:
+                            # The final line carries the token counts
+                            usage.input_tokens = data.get("prompt_eval_count", 0)
+                            usage.output_tokens = data.get("eval_count", 0)
+                    except (orjson.JSONDecodeError, KeyError, TypeError):
+                        logger.debug("Skipping unparseable stream line: %r", line)
+                        continue
+    
+    def estimate_cost(self, input_tokens: int, output_tokens: int, cached_tokens: int = 0) -> float:
+        return 0.0  # FREE!
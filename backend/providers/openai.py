@@ -0,0 +1,26 @@
+"""
+OpenAI provider.
+"""
+
+import os
+
+from providers.openai_compat import OpenAICompatProvider
+
+
+class OpenAIProvider(OpenAICompatProvider):
+    """
+    OpenAI GPT-4o - High quality, pay-as-you-go.
+    ~$0.0025 per 1K input tokens, ~$0.01 per 1K output tokens
+    """
+    
+    # Pricing per 1K tokens
+    PRICING = {
+        "gpt-4o-mini": {"input": 0.00015, "output": 0.0006},
+        "gpt-4o": {"input": 0.0025, "output": 0.01},
+    }
+    
+    def __init__(self, api_key: str = None, model: str = "gpt-4o-mini"):
+        # Cached prompt prefixes are billed at half the input price
+        super().__init__("https://api.openai.com/v1", model, api_key or os.getenv("OPENAI_API_KEY"),
+                         extra_body={"temperature": 0.7},
+                         pricing=self.PRICING.get(model, self.PRICING["gpt-4o-mini"]), cached_discount=0.5)
@@ -0,0 +1,85 @@
+"""
+Base provider for APIs speaking the OpenAI chat-completions format.
+"""
+
+import logging
+from typing import AsyncGenerator, List, Dict, Tuple, Optional, Any
+
+import orjson
+
+from providers.base import AIProvider, Usage, JSON_HEADERS, HTTP_CLIENT, sse_data_iter, parse_json, openai_usage
+
+
+logger = logging.getLogger(__name__)
+
+
+class OpenAICompatProvider(AIProvider):
+    """
+    Any API speaking the OpenAI chat-completions format.
+    Pricing is per 1K tokens; cached_discount is the fraction of the input
+    price charged for prompt-cached tokens.
+    """
+    
+    def __init__(self, base_url: str, model: str, api_key: str = None,
+                 extra_headers: Dict[str, str] = None, extra_body: Dict[str, Any] = None,
+                 pricing: Dict[str, float] = None, cached_discount: float = 1.0):
+        self.base_url = base_url
+        self.model = model
+        self.api_key = api_key
+        self.extra_headers = extra_headers or {}
+        self.extra_body = extra_body or {}
+        self.pricing = pricing or {"input": 0.0, "output": 0.0}
+        self.cached_discount = cached_discount
+        self.client = HTTP_CLIENT
+        # Same for every request, so build them once
+        self._url = f"{self.base_url}/chat/completions"
+        self._headers = {"Authorization": f"Bearer {self.api_key}", **self.extra_headers, **JSON_HEADERS}
+    
+    async def chat_with_usage(self, messages: List[Dict[str, str]]) -> Tuple[str, int, int, int]:
+        response = await self.client.post(
+            self._url,
+            headers=self._headers,
+            content=orjson.dumps({
+                "model": self.model,
+                "messages": messages,
+                **self.extra_body
+            })
+        )
+        response.raise_for_status()
+        body = await parse_json(response.content)
+        return (body["choices"][0]["message"]["content"], *openai_usage(body))
+    
+    async def chat_stream(self, messages: List[Dict[str, str]],
+                          usage: Optional[Usage] = None) -> AsyncGenerator[str, None]:
+        async with self.client.stream(
+            "POST",
+            self._url,
+            headers=self._headers,
+            content=orjson.dumps({
+                "model": self.model,
+                "messages": messages,
+                **self.extra_body,
+                "stream": True,
+                # Ask for a final event with token counts, so streamed turns are billed like /chat
+                "stream_options": {"include_usage": True}
+            })
+        ) as response:
+            response.raise_for_status()
+            async for data in sse_data_iter(response):
+                try:
+                    chunk = orjson.loads(data)
+                    if chunk.get("usage") and usage is not None:
+                        usage.input_tokens, usage.output_tokens, usage.cached_tokens = openai_usage(chunk)
+                    if not chunk.get("choices"):
+                        continue  # The usage event carries no text
+                    delta = chunk["choices"][0].get("delta", {})
+                    if "content" in delta:
+                        yield delta["content"]
+                except (orjson.JSONDecodeError, KeyError, IndexError, TypeError):
+                    logger.debug("Skipping unparseable stream event: %r", bytes(data))
+                    continue
+    
+    def estimate_cost(self, input_tokens: int, output_tokens: int, cached_tokens: int = 0) -> float:
+        uncached = input_tokens - cached_tokens
+        input_cost = (uncached + cached_tokens * self.cached_discount) * self.pricing["input"]
+        return (input_cost + output_tokens * self.pricing["output"]) / 1000
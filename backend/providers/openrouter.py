@@ -0,0 +1,21 @@
+"""
+OpenRouter provider.
+"""
+
+import os
+
+from providers.openai_compat import OpenAICompatProvider
+
+
+class OpenRouterProvider(OpenAICompatProvider):
+    """
+    OpenRouter - Access many models, pay-as-you-go.
+    Good cheap option: meta-llama/llama-3.2-3b-instruct
+    """
+    
+    def __init__(self, api_key: str = None, model: str = "meta-llama/llama-3.2-3b-instruct"):
+        # Very rough estimate - OpenRouter pricing varies by model
+        # Llama 3.2 3B is about $0.0001 per 1K tokens total
+        super().__init__("https://openrouter.ai/api/v1", model, api_key or os.getenv("OPENROUTER_API_KEY"),
+                         extra_headers={"HTTP-Referer": "https://techhelper.ai", "X-Title": "TechHelper AI"},
+                         pricing={"input": 0.0001, "output": 0.0001})
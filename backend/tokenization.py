@@ -0,0 +1,36 @@
+"""
+Token counting for TechHelper AI.
+Uses the model's real tokenizer when tiktoken knows it, otherwise estimates.
+"""
+
+from typing import Dict, Optional
+
+import tiktoken
+
+
+# Filled by load_encoder at startup; counting never loads anything itself
+_encoders: Dict[str, Optional[tiktoken.Encoding]] = {}
+
+
+def load_encoder(model: str) -> bool:
+    """
+    Resolve the tokenizer for a model, downloading it on first use.
+    Blocking (network) - call it off the event loop. Returns False when
+    the model falls back to estimating.
+    """
+    try:
+        _encoders[model] = tiktoken.encoding_for_model(model)
+    except Exception:
+        # Not an OpenAI model (KeyError, e.g. Llama) or the download failed
+        _encoders[model] = None
+    return _encoders[model] is not None
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Count tokens in text for the given model."""
+    encoder = _encoders.get(model) if model else None
+    if encoder is None:
+        return len(text) // 4  # Rough estimate (4 chars ≈ 1 token)
+    # Plain text only: user messages may contain strings like <|endoftext|>,
+    # which encode() would reject as special tokens
+    return len(encoder.encode_ordinary(text))